@@ -0,0 +1,33 @@
+import sys
+import json
+
+class NdjsonWriter:
+    """Buffered writer that emits one JSON record per line to stdout."""
+
+    def __init__(self, stream=None, buffer_size=64 * 1024):
+        # Bind to the real stdout up front so text output can be redirected to stderr
+        self.stream = stream or sys.stdout.buffer
+        self.buffer_size = buffer_size
+        self.chunks = []
+        self.pending = 0
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        data = line.encode("utf-8")
+        self.chunks.append(data)
+        self.pending += len(data)
+        if self.pending >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            self.stream.write(b"".join(self.chunks))
+            self.chunks = []
+            self.pending = 0
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
@@ -1,21 +1,29 @@
 import os
+import sys
+import time
 import argparse
+import contextlib
 import shutil
 import re
 import yaml
+from collections import Counter
+from ndjson_writer import NdjsonWriter
+from vault_analyzer import parse_frontmatter, extract_tags, extract_links
 
 def move_file(src, dest):
-    """Safely move file and create directories if needed."""
+    """Safely move file and create directories if needed. Returns True if the file ends up at dest."""
     if os.path.abspath(src) == os.path.abspath(dest):
-        return
+        return True
     print(f"Moving: {src} -> {dest}")
     dest_dir = os.path.dirname(dest)
     if not os.path.exists(dest_dir):
         os.makedirs(dest_dir, exist_ok=True)
     try:
         shutil.move(src, dest)
+        return True
     except Exception as e:
         print(f"Error moving {src}: {e}")
+        return False
 
 def trash_file(path, vault_root):
     """Safe delete: move file to Archive/Trash in the vault."""
@@ -43,8 +51,11 @@ def rename_file(old_path, new_name):
     print(f"Renaming: {old_path} -> {new_path}")
     os.rename(old_path, new_path)
 
-def get_note_type(file_path):
-    """Determine note type (moc, log, project, ref, atom, sum) from content or prefix."""
+def get_note_type(file_path, content=None):
+    """Determine note type (moc, log, project, ref, atom, sum) from content or prefix.
+
+    Pass already-read content to avoid reopening the file.
+    """
     basename = os.path.basename(file_path)
     ext = os.path.splitext(file_path)[1].lower()
     
@@ -68,20 +79,23 @@ def get_note_type(file_path):
     # 3. Try reading content for type
     if ext in ['.md', '.json']:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read(2000)
-                # Check YAML for .md
-                if ext == '.md':
-                    match = re.search(r'^---\n(.*?)\n---', content, re.DOTALL)
-                    if match:
-                        data = yaml.safe_load(match.group(1))
-                        if data:
-                            if 'type' in data: return data['type'].lower()
-                            if 'status' in data and data['status'] == 'active': return 'project'
-                # Check JSON for log-like indicators
-                elif ext == '.json':
-                    if any(k in content for k in ["周会", "会议", "Meeting", "Log"]): return 'log'
-                    if '"block_type":' in content or '"text_run":' in content: return 'atom'
+            if content is None:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read(2000)
+            else:
+                content = content[:2000]
+            # Check YAML for .md
+            if ext == '.md':
+                match = re.search(r'^---\n(.*?)\n---', content, re.DOTALL)
+                if match:
+                    data = yaml.safe_load(match.group(1))
+                    if data:
+                        if 'type' in data: return data['type'].lower()
+                        if 'status' in data and data['status'] == 'active': return 'project'
+            # Check JSON for log-like indicators
+            elif ext == '.json':
+                if any(k in content for k in ["周会", "会议", "Meeting", "Log"]): return 'log'
+                if '"block_type":' in content or '"text_run":' in content: return 'atom'
         except:
             pass
     
@@ -127,15 +141,17 @@ def auto_rename_file(file_path, ntype):
     prefix = TYPE_PREFIX_MAP.get(ntype, TYPE_PREFIX_MAP["default"])
     return prefix + clean_name
 
-def get_semantic_category(file_path):
+def get_semantic_category(file_path, content=None):
     """Ask AI to classify note into a Chinese Folder Name."""
-    content = ""
     basename = os.path.basename(file_path)
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read(5000)
-    except:
-        return "待整理"
+    if content is None:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read(5000)
+        except:
+            return "待整理"
+    else:
+        content = content[:5000]
 
     # Weighted Keyword Scoring System (Simulated AI)
     # Weights: Filename match = 10 points, Content match = 1 point
@@ -225,7 +241,7 @@ def identify_project_group(filename):
             return base[len(prefix):]
     return base
 
-def get_destination_dir(vault_root, file_path, ntype, args):
+def get_destination_dir(vault_root, file_path, ntype, args, category=None):
     """Determine the correct ACES pillar and subfolder."""
     if ntype == 'moc':
         return os.path.join(vault_root, "Atlas 知识库", "Maps")
@@ -238,7 +254,8 @@ def get_destination_dir(vault_root, file_path, ntype, args):
         return os.path.join(vault_root, "Effort 执行力", "Ongoing 进行中", proj_folder)
     else:
         # Atomic notes: Route to Atlas (Knowledge) or Spaces (Area)
-        category = get_semantic_category(file_path)
+        if category is None:
+            category = get_semantic_category(file_path)
         
         # ACES Routing Logic
         # Spaces: Personal Areas of Responsibility
@@ -252,9 +269,36 @@ def get_destination_dir(vault_root, file_path, ntype, args):
         # Fallback: Inbox
         return os.path.join(vault_root, "Inbox 收集箱")
 
-def auto_classify(vault_root):
-    """Orchestrate the organization of the entire vault into ACES."""
+def read_note(file_path):
+    """Read a note's full text once so NDJSON mode doesn't reopen it per check."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except:
+        return None
+
+def note_details(file_path, content):
+    """Extract tags and wiki-links from a note for NDJSON records."""
+    if not file_path.endswith('.md') or content is None:
+        return [], []
+    frontmatter = parse_frontmatter(content)
+    if not isinstance(frontmatter, dict):
+        frontmatter = {}
+    return extract_tags(content, frontmatter), extract_links(content)
+
+def auto_classify(vault_root, writer=None):
+    """Orchestrate the organization of the entire vault into ACES.
+
+    If a writer is given, one NDJSON record is emitted per routed note and a
+    summary record at the end.
+    """
     print(f"Starting Intelligent ACES Classification: {vault_root}")
+    run_start = time.perf_counter()
+    type_counts = Counter()
+    # Notes moved this run; os.walk may reach their new folder later and would
+    # revisit them. Grows with notes moved, not with notes already in place.
+    moved_paths = set()
+    failed = 0
     
     # Pillar Migration Map (Old -> New)
     PILLAR_MIGRATION = {
@@ -315,7 +359,10 @@ def auto_classify(vault_root):
 
             # Note-like files (MD and Note-JSONs)
             if ext in ['.md', '.json']:
-                ntype = get_note_type(path)
+                if path in moved_paths: continue
+                note_start = time.perf_counter()
+                content = read_note(path) if writer else None
+                ntype = get_note_type(path, content)
                 
                 # If it's a JSON but NOT a note (no content), treat as asset or trash
                 if ext == '.json' and ntype is None:
@@ -325,14 +372,19 @@ def auto_classify(vault_root):
                     move_file(path, os.path.join(dest_dir, file))
                     continue
                 
+                category = None
                 if ntype:
+                    if ntype == 'project':
+                        category = identify_project_group(file)
+                    elif ntype not in ['moc', 'log'] and writer:
+                        category = get_semantic_category(path, content)
                     new_filename = auto_rename_file(path, ntype)
-                    dest_dir = get_destination_dir(vault_root, path, ntype, args)
-                    move_file(path, os.path.join(dest_dir, new_filename))
+                    dest_dir = get_destination_dir(vault_root, path, ntype, None, category)
+                    dest = os.path.join(dest_dir, new_filename)
                 else:
                     # Move unidentified but non-asset MDs via AI/Score
                     if ext == '.md':
-                        category = get_semantic_category(path) # Returns Chinese Name
+                        category = get_semantic_category(path, content) # Returns Chinese Name
                         # Route based on Category -> Pillar
                         if category in ["生活琐事", "人文社交", "管理复盘", "运动健康"]:
                             dest_base = os.path.join(vault_root, "Spaces 我的生活", category)
@@ -342,7 +394,30 @@ def auto_classify(vault_root):
                             dest_base = os.path.join(vault_root, "Inbox 收集箱")
                             
                         new_filename = auto_rename_file(path, 'atom')
-                        move_file(path, os.path.join(dest_base, new_filename))
+                        dest = os.path.join(dest_base, new_filename)
+                    else:
+                        continue
+
+                routed = move_file(path, dest)
+                if routed:
+                    if os.path.abspath(dest) != os.path.abspath(path):
+                        moved_paths.add(dest)
+                    type_counts[ntype or 'atom'] += 1
+                else:
+                    failed += 1
+                if writer:
+                    tags, links = note_details(path, content)
+                    writer.write({
+                        "record": "note",
+                        "path": os.path.relpath(path, vault_root),
+                        "type": ntype or 'atom',
+                        "category": category,
+                        "destination": os.path.relpath(dest, vault_root) if routed else None,
+                        "routed": routed,
+                        "tags": tags,
+                        "links": links,
+                        "ms": round((time.perf_counter() - note_start) * 1000, 3),
+                    })
 
             # Pure Assets
             elif ext in ['.png', '.jpg', '.jpeg', '.gif', '.pdf', '.docx', '.xlsx', '.pages', '.csv', '.webp', '.mp4', '.avif', '.mov', '.zip', '.txt']:
@@ -385,11 +460,22 @@ def auto_classify(vault_root):
             except:
                 pass
 
+    if writer:
+        writer.write({
+            "record": "summary",
+            "notes": sum(type_counts.values()),
+            "types": dict(type_counts),
+            "failed": failed,
+            "ms": round((time.perf_counter() - run_start) * 1000, 3),
+        })
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--auto-classify", action="store_true", help="Route files to ACE pillars")
     parser.add_argument("--vault", help="Vault root path")
     parser.add_argument("--trash", help="Move file to trash")
+    parser.add_argument("--format", choices=["text", "ndjson"], default="text",
+                        help="ndjson streams one JSON record per routed note plus a summary record")
     
     # API Args
     parser.add_argument("--api-key", help="OpenAI API Key")
@@ -412,5 +498,9 @@ if __name__ == "__main__":
     if args.auto_classify:
         if not args.vault:
             print("Error: --vault is required")
+        elif args.format == "ndjson":
+            # Keep stdout clean for records; progress messages go to stderr
+            with NdjsonWriter() as writer, contextlib.redirect_stdout(sys.stderr):
+                auto_classify(args.vault, writer)
         else:
             auto_classify(args.vault)
@@ -0,0 +1,104 @@
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+from ndjson_writer import NdjsonWriter
+from vault_analyzer import stream_vault
+from structure_enforcer import auto_classify
+
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+
+def make_vault(root):
+    os.makedirs(os.path.join(root, "sub"))
+    notes = {
+        "A.md": "---\ntype: atom\ntags: [ai, 1, {a: 1}]\n---\nhello [[B]] #foo\n",
+        "sub/B.md": "Docker Linux Python 代码 [[A|a]]\n",
+        "sub/C.md": "",
+        "周会记录.md": "会议 notes\n",
+    }
+    for name, text in notes.items():
+        with open(os.path.join(root, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+def parse(raw):
+    lines = raw.decode("utf-8").splitlines()
+    return [json.loads(line) for line in lines]
+
+# 1. Writer buffers until the threshold, then flushes whole lines
+out = io.BytesIO()
+writer = NdjsonWriter(out, buffer_size=64)
+writer.write({"n": 1})
+assert out.getvalue() == b"", "flushed before reaching buffer size"
+for i in range(10):
+    writer.write({"n": i, "text": "笔记"})
+assert out.getvalue().endswith(b"\n"), "flush split a record"
+writer.flush()
+records = parse(out.getvalue())
+assert len(records) == 11
+assert records[-1]["text"] == "笔记"
+print("writer: ok")
+
+vault = tempfile.mkdtemp()
+try:
+    make_vault(vault)
+
+    # 2. Analyzer stream: one record per note, summary last, bad tags skipped
+    out = io.BytesIO()
+    with NdjsonWriter(out) as writer:
+        stream_vault(vault, writer, scan=True, graph=True)
+    records = parse(out.getvalue())
+    notes = [r for r in records if r["record"] == "note"]
+    assert len(notes) == 4
+    assert records[-1]["record"] == "summary"
+    assert records[-1]["md_files"] == 4
+    a = next(r for r in notes if r["path"] == "A.md")
+    assert a["tags"] == ["ai", "1", "foo"], a["tags"]
+    assert a["links"] == ["B"]
+    assert any(r["path"] == "周会记录.md" for r in notes)
+    print("stream_vault: ok")
+
+    # 3. CLI keeps stdout for records only
+    result = subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS, "vault_analyzer.py"), "--format", "ndjson", "--scan", vault],
+        capture_output=True, check=True,
+    )
+    assert [r["record"] for r in parse(result.stdout)][-1] == "summary"
+    print("vault_analyzer --format ndjson: ok")
+
+    # 4. Enforcer: each note reported once, with its destination
+    out = io.BytesIO()
+    with NdjsonWriter(out) as writer:
+        auto_classify(vault, writer)
+    records = parse(out.getvalue())
+    notes = [r for r in records if r["record"] == "note"]
+    assert len(notes) == 4, [r["path"] for r in notes]
+    assert all(r["routed"] and r["destination"] for r in notes)
+    log = next(r for r in notes if r["path"] == "周会记录.md")
+    assert log["type"] == "log"
+    assert log["destination"] == os.path.join("Calendar 时间轴", "Log-周会记录.md")
+    assert records[-1]["record"] == "summary"
+    assert records[-1]["notes"] == 4 and records[-1]["failed"] == 0
+    print("auto_classify(writer): ok")
+
+    # 5. Enforcer on an already-organized vault: in-place notes are all reported
+    shutil.rmtree(vault)
+    calendar = os.path.join(vault, "Calendar 时间轴")
+    os.makedirs(calendar)
+    for name in ["Log-a.md", "Log-b.md", "Log-c.md"]:
+        with open(os.path.join(calendar, name), "w", encoding="utf-8") as f:
+            f.write("会议 notes\n")
+    out = io.BytesIO()
+    with NdjsonWriter(out) as writer:
+        auto_classify(vault, writer)
+    records = parse(out.getvalue())
+    notes = [r for r in records if r["record"] == "note"]
+    assert sorted(r["path"] for r in notes) == [os.path.join("Calendar 时间轴", n) for n in ["Log-a.md", "Log-b.md", "Log-c.md"]]
+    assert all(r["routed"] and r["path"] == r["destination"] for r in notes)
+    assert records[-1]["notes"] == 3 and records[-1]["types"] == {"log": 3}
+    print("auto_classify(writer) in place: ok")
+finally:
+    shutil.rmtree(vault)
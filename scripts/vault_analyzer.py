@@ -1,5 +1,8 @@
 import os
+import sys
+import time
 import argparse
+import contextlib
 try:
     import yaml
     HAS_YAML = True
@@ -8,6 +11,7 @@ except ImportError:
 import re
 from pathlib import Path
 from collections import Counter
+from ndjson_writer import NdjsonWriter
 
 def parse_frontmatter(content):
     if not HAS_YAML:
@@ -20,61 +24,123 @@ def parse_frontmatter(content):
             return {}
     return {}
 
-def scan_vault(vault_path):
-    print(f"Scanning vault at: {vault_path}")
-    stats = {
-        "total_files": 0,
-        "md_files": 0,
-        "folders": 0,
-        "tags": Counter(),
-        "empty_files": [],
-        "links": {},  # file -> list of links
-        "backlinks": Counter() # file -> incoming count
-    }
-    
+def extract_tags(content, frontmatter):
+    tags = []
+    if "tags" in frontmatter:
+        fm_tags = frontmatter["tags"]
+        if isinstance(fm_tags, list):
+            # Skip nested YAML values (dicts/lists) that can't be counted as tags
+            tags.extend([str(t) for t in fm_tags if isinstance(t, (str, int, float))])
+        elif isinstance(fm_tags, str):
+            tags.extend([t.strip() for t in fm_tags.split(",")])
+
+    # Inline tags
+    tags.extend(re.findall(r'#(\w+)', content))
+    return tags
+
+def extract_links(content):
+    # Extract wiki-links: [[LinkName]] 或 [[LinkName|Alias]]
+    return re.findall(r'\[\[(.*?)(?:\|.*?)?\]\]', content)
+
+def iter_notes(vault_path, counts):
+    """Yield one record per Markdown note, updating folder/file counts in place."""
     for root, dirs, files in os.walk(vault_path):
         if ".obsidian" in root or ".git" in root or "assets" in root:
             continue
             
-        stats["folders"] += 1
+        counts["folders"] += 1
         for file in files:
-            stats["total_files"] += 1
+            counts["total_files"] += 1
             if file.endswith(".md"):
-                stats["md_files"] += 1
+                counts["md_files"] += 1
                 file_path = os.path.join(root, file)
                 rel_path = os.path.relpath(file_path, vault_path)
+                start = time.perf_counter()
                 try:
                     with open(file_path, 'r', encoding='utf-8') as f:
                         content = f.read()
-                        if not content.strip():
-                            stats["empty_files"].append(rel_path)
-                        
-                        frontmatter = parse_frontmatter(content)
-                        if "tags" in frontmatter:
-                            tags = frontmatter["tags"]
-                            if isinstance(tags, list):
-                                stats["tags"].update(tags)
-                            elif isinstance(tags, str):
-                                stats["tags"].update([t.strip() for t in tags.split(",")])
-                        
-                        # Inline tags
-                        inline_tags = re.findall(r'#(\w+)', content)
-                        stats["tags"].update(inline_tags)
-
-                        # Extract wiki-links: [[LinkName]] 或 [[LinkName|Alias]]
-                        links = re.findall(r'\[\[(.*?)(?:\|.*?)?\]\]', content)
-                        stats["links"][rel_path] = links
-                        for link in links:
-                            # Normalize link (remove extension if added, etc. - Obsidian usually doesn't add .md)
-                            stats["backlinks"][link] += 1
+                    frontmatter = parse_frontmatter(content)
+                    if not isinstance(frontmatter, dict):
+                        frontmatter = {}
+                    note = {
+                        "path": rel_path,
+                        "type": frontmatter.get("type"),
+                        "empty": not content.strip(),
+                        "tags": extract_tags(content, frontmatter),
+                        "links": extract_links(content),
+                    }
                 except Exception as e:
                     print(f"Error reading {file}: {e}")
+                    continue
+                note["ms"] = round((time.perf_counter() - start) * 1000, 3)
+                yield note
+
+def scan_vault(vault_path):
+    print(f"Scanning vault at: {vault_path}")
+    stats = {
+        "total_files": 0,
+        "md_files": 0,
+        "folders": 0,
+        "tags": Counter(),
+        "empty_files": [],
+        "links": {},  # file -> list of links
+        "backlinks": Counter() # file -> incoming count
+    }
+    
+    for note in iter_notes(vault_path, stats):
+        if note["empty"]:
+            stats["empty_files"].append(note["path"])
+        stats["tags"].update(note["tags"])
+        stats["links"][note["path"]] = note["links"]
+        for link in note["links"]:
+            # Normalize link (remove extension if added, etc. - Obsidian usually doesn't add .md)
+            stats["backlinks"][link] += 1
                     
     return stats
 
-def analyze_graph(stats):
-    print("\n--- Graph Density Analysis ---")
-    
+def stream_vault(vault_path, writer, scan=False, graph=False):
+    """Write one NDJSON record per note, then a summary record.
+
+    Aggregates are only kept for the stats that were requested, so a plain
+    stream holds nothing but the file counters in memory.
+    """
+    start = time.perf_counter()
+    stats = {"total_files": 0, "md_files": 0, "folders": 0}
+    if scan:
+        stats["tags"] = Counter()
+        stats["empty_files"] = 0
+    if graph:
+        stats["links"] = {}
+        stats["backlinks"] = Counter()
+
+    for note in iter_notes(vault_path, stats):
+        writer.write({"record": "note", **note})
+        if scan:
+            stats["tags"].update(note["tags"])
+            if note["empty"]:
+                stats["empty_files"] += 1
+        if graph:
+            stats["links"][note["path"]] = note["links"]
+            stats["backlinks"].update(note["links"])
+
+    summary = {
+        "record": "summary",
+        "folders": stats["folders"],
+        "total_files": stats["total_files"],
+        "md_files": stats["md_files"],
+    }
+    if scan:
+        summary["top_tags"] = stats["tags"].most_common(5)
+        summary["empty_files"] = stats["empty_files"]
+    if graph:
+        hubs, islands = graph_metrics(stats)
+        summary["hubs"] = [{"path": f, "score": s, "out": o, "in": i} for f, s, o, i in hubs[:5]]
+        summary["islands"] = len(islands)
+    summary["ms"] = round((time.perf_counter() - start) * 1000, 3)
+    writer.write(summary)
+
+def graph_metrics(stats):
+    """Return (hubs, islands) with hubs sorted by combined link score."""
     # Hubs: High outgoing OR high incoming
     hubs = []
     for file, out_links in stats["links"].items():
@@ -82,10 +148,6 @@ def analyze_graph(stats):
         hubs.append((file, score, len(out_links), stats["backlinks"][Path(file).stem]))
     
     hubs.sort(key=lambda x: x[1], reverse=True)
-    
-    print("\nTop Potential MOC Candidates (Hubs):")
-    for file, score, out, inc in hubs[:5]:
-        print(f"- {file} (Score: {score}, Out: {out}, In: {inc})")
 
     # Islands: No outgoing AND no incoming
     islands = []
@@ -93,6 +155,16 @@ def analyze_graph(stats):
         stem = Path(file).stem
         if not stats["links"][file] and stats["backlinks"][stem] == 0:
             islands.append(file)
+    return hubs, islands
+
+def analyze_graph(stats):
+    print("\n--- Graph Density Analysis ---")
+    
+    hubs, islands = graph_metrics(stats)
+    
+    print("\nTop Potential MOC Candidates (Hubs):")
+    for file, score, out, inc in hubs[:5]:
+        print(f"- {file} (Score: {score}, Out: {out}, In: {inc})")
             
     print(f"\nOrphaned Notes (Islands): {len(islands)}")
     for file in islands[:5]:
@@ -104,11 +176,17 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--scan", action="store_true")
     parser.add_argument("--graph", action="store_true")
+    parser.add_argument("--format", choices=["text", "ndjson"], default="text",
+                        help="ndjson streams one JSON record per note plus a summary record")
     parser.add_argument("path", help="Path to the vault or folder")
     
     args = parser.parse_args()
     
-    if args.scan or args.graph:
+    if args.format == "ndjson":
+        # Keep stdout clean for records; diagnostics go to stderr
+        with NdjsonWriter() as writer, contextlib.redirect_stdout(sys.stderr):
+            stream_vault(args.path, writer, scan=args.scan, graph=args.graph)
+    elif args.scan or args.graph:
         stats = scan_vault(args.path)
         
         if args.scan: